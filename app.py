@@ -1,17 +1,29 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import os, re, json, sqlite3, time, logging, threading
-from collections import deque
-from contextlib import closing
+import os, re, sys, stat, json, sqlite3, time, logging, threading, queue, atexit, itertools, bisect, functools, hashlib, heapq
+from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
 from datetime import datetime
+from urllib.parse import unquote, unquote_plus
 
-from flask import Flask, request, redirect, url_for, render_template, session, flash, jsonify
+from flask import Flask, Response, request, redirect, url_for, render_template, session, flash, \
+    get_flashed_messages, stream_with_context
 from werkzeug.middleware.proxy_fix import ProxyFix
-from jinja2 import DictLoader
+from jinja2 import DictLoader, FileSystemBytecodeCache
 import qbittorrentapi
+try:
+    import orjson
+    jloads = orjson.loads
+    def jdumpb(v) -> bytes: return orjson.dumps(v)
+except ImportError:
+    jloads = json.loads
+    def jdumpb(v) -> bytes: return json.dumps(v).encode()
+def jdumps(v) -> str: return jdumpb(v).decode()
 
 # -------------------- Config --------------------
 APP_PORT = int(os.environ.get("MCC_PORT", "8069"))
@@ -19,6 +31,10 @@ APP_HOST = os.environ.get("MCC_HOST", "0.0.0.0")
 LOGIN_USER = os.environ.get("MCC_USER", "admin")
 LOGIN_PASS = os.environ.get("MCC_PASS", "adminadmin")
 DB_PATH    = os.environ.get("MCC_DB", os.path.expanduser("~/.magnet_cc.sqlite"))
+DB_POOL_SIZE = max(1, int(os.environ.get("MCC_DB_POOL", "4")))
+# Un dossier par utilisateur (comme le cache par défaut de Jinja) ; propriété/droits vérifiés à l'usage
+JINJA_CACHE_DIR = os.environ.get("MCC_JINJA_CACHE", f"/tmp/mcc_jinja-{os.getuid() if hasattr(os, 'getuid') else 0}")
+UI_LOGLEVEL = os.environ.get("MCC_UI_LOGLEVEL", "INFO").upper()  # seuil des logs affichés dans /logs
 
 DEFAULT_JSON_DIRS = [p for p in os.environ.get("MCC_JSON_DIRS","/data/alldebrid").split(":") if p]
 
@@ -26,37 +42,77 @@ logging.basicConfig(level=os.environ.get("LOGLEVEL","INFO"))
 logger = logging.getLogger("app")
 
 # -------------------- In-memory live logs --------------------
-LOG_RING = deque(maxlen=2000)
-LOG_SEQ = {"n": 0}
+# Anneau préalloué de tuples (seq, ts, msg), indexé par seq & masque (taille puissance de 2)
+LOG_RING_SIZE = 2048
+_LOG_MASK = LOG_RING_SIZE - 1
+_LOG_RING: List[Optional[Tuple[int,int,str]]] = [None] * LOG_RING_SIZE
+_LOG_SEQ = itertools.count(1)
+_LOG_HEAD = [0]  # dernier seq écrit
+_LOG_Q: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
 
 class UILogHandler(logging.Handler):
+    # emit() ne fait qu'empiler le record ; formatage et écriture dans l'anneau
+    # se font dans un unique thread consommateur (drain_loop)
     def emit(self, record):
-        try:
-            msg = self.format(record)
-        except Exception:
-            msg = record.getMessage()
-        LOG_SEQ["n"] += 1
-        LOG_RING.append({"seq": LOG_SEQ["n"], "msg": msg, "ts": int(time.time())})
+        _LOG_Q.put_nowait(record)
+
+    def drain_loop(self):
+        while True:
+            record = _LOG_Q.get()
+            try:
+                msg = self.format(record)
+            except Exception:
+                msg = str(record.msg)
+            i = next(_LOG_SEQ)
+            _LOG_RING[i & _LOG_MASK] = (i, int(record.created), msg)
+            _LOG_HEAD[0] = i
+
+def log_tail(since: int) -> Tuple[List[str], int]:
+    """Messages de seq > since, du plus ancien au plus récent, + curseur courant."""
+    head = _LOG_HEAD[0]
+    out: List[str] = []
+    i, stop = head, max(since, head - LOG_RING_SIZE)
+    while i > stop:
+        slot = _LOG_RING[i & _LOG_MASK]
+        if slot is None or slot[0] != i: break  # slot réécrit entre-temps
+        out.append(slot[2]); i -= 1
+    out.reverse()
+    return out, head
 
 ui_handler = UILogHandler()
 ui_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
-logging.getLogger().addHandler(ui_handler)
-logger.addHandler(ui_handler)
+ui_handler.setLevel(UI_LOGLEVEL)
+# Lignes d'accès werkzeug (dont le polling /logs/tail toutes les 2s) : jamais utiles dans l'UI.
+# Reconnues à leur préfixe « adresse - - [date] » ; les lignes de démarrage du serveur restent.
+def _not_access_line(r: logging.LogRecord) -> bool:
+    return not (r.name == "werkzeug" and r.levelno < logging.WARNING
+                and isinstance(r.msg, str) and " - - [" in r.msg)
+ui_handler.addFilter(_not_access_line)
+threading.Thread(target=ui_handler.drain_loop, name="ui-log", daemon=True).start()
+# Uniquement sur le root : les loggers enfants (dont "app") propagent déjà jusqu'ici.
+# Un rechargement du module remplace l'ancien handler au lieu de l'empiler.
+_root_logger = logging.getLogger()
+for _h in [h for h in _root_logger.handlers if type(h).__name__ == "UILogHandler"]:
+    _root_logger.removeHandler(_h)
+_root_logger.addHandler(ui_handler)
 
 # -------------------- Utils --------------------
+_UNITS = ("B","KB","MB","GB","TB","PB")
+_THRESH = tuple(1024**i for i in range(len(_UNITS)))
+
+@functools.lru_cache(maxsize=4096)
 def human(n: Optional[int]) -> str:
     if not n or n <= 0: return "0 B"
-    units = ["B","KB","MB","GB","TB","PB"]
-    s = 0; f = float(n)
-    while f >= 1024 and s < len(units)-1:
-        f /= 1024.0; s += 1
-    if s <= 1: return f"{int(f)} {units[s]}"
-    return f"{f:.2f} {units[s]}"
+    s = bisect.bisect_right(_THRESH, n) - 1
+    f = n / _THRESH[s]
+    if s <= 1: return f"{int(f)} {_UNITS[s]}"
+    return f"{f:.2f} {_UNITS[s]}"
 
 def now_ts() -> int: return int(time.time())
 def ensure_int(x, default=0):
-    try: return int(x)
-    except: return default
+    if type(x) is int: return x
+    try: return int(x)  # chaînes des formulaires comprises : > 4300 chiffres => ValueError
+    except (TypeError, ValueError, OverflowError): return default
 
 # -------------------- DB --------------------
 SCHEMA = """
@@ -78,78 +134,206 @@ CREATE TABLE IF NOT EXISTS sent (
   client_id INTEGER,
   ts INTEGER
 );
+CREATE INDEX IF NOT EXISTS idx_sent_ts ON sent(ts DESC);
+CREATE INDEX IF NOT EXISTS idx_sent_client ON sent(client_id, ts);
 """
+# Pragmas par connexion ; journal_mode=WAL est persistant dans le fichier, posé une fois dans init_db()
+DB_PRAGMAS = (
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+)
 def db():
-    c = sqlite3.connect(DB_PATH)
-    c.row_factory = sqlite3.Row
+    c = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+    for p in DB_PRAGMAS: c.execute(p)
     return c
+
+# Connexions persistantes : N lecteurs dans une file + 1 écrivain unique (sérialisé par verrou)
+_POOL: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=DB_POOL_SIZE)
+_WRITER = {"con": None, "lock": threading.Lock()}
+
+@contextmanager
+def conn(write: bool = False):
+    if write:
+        with _WRITER["lock"]:
+            if _WRITER["con"] is None: _WRITER["con"] = db()
+            con = _WRITER["con"]
+            try:
+                yield con
+            finally:
+                if con.in_transaction: con.rollback()
+        return
+    try: con = _POOL.get_nowait()
+    except queue.Empty: con = db()
+    try:
+        yield con
+    finally:
+        try: _POOL.put_nowait(con)
+        except queue.Full: con.close()
+
+def close_all():
+    with _WRITER["lock"]:
+        if _WRITER["con"] is not None:
+            _WRITER["con"].close(); _WRITER["con"] = None
+    while True:
+        try: _POOL.get_nowait().close()
+        except queue.Empty: break
+atexit.register(close_all)
+
+# Cache des settings : JSON brut par clé (None = absent en base), décodé à chaque lecture
+# pour que les appelants puissent modifier la valeur rendue sans toucher au cache.
+_SETTINGS: Dict[str, Optional[str]] = {}
+_SETTINGS_LOCK = threading.Lock()
+
 def init_db():
-    with closing(db()) as con:
+    with conn(write=True) as con:
+        con.execute("PRAGMA journal_mode=WAL")
         con.executescript(SCHEMA)
-        con.commit()
+        con.execute("ANALYZE")
+        rows = con.execute("SELECT k,v FROM settings").fetchall()
+    with _SETTINGS_LOCK:
+        _SETTINGS.clear(); _SETTINGS.update(rows)
 init_db()
 
 def set_setting(k: str, v):
-    with closing(db()) as con:
-        con.execute("REPLACE INTO settings(k,v) VALUES (?,?)", (k, json.dumps(v)))
-        con.commit()
+    raw = jdumps(v)
+    with conn(write=True) as con:
+        con.execute("REPLACE INTO settings(k,v) VALUES (?,?)", (k, raw))
+        with _SETTINGS_LOCK: _SETTINGS[k] = raw
+def set_settings(values: Dict[str, object]):
+    """Plusieurs réglages dans une seule transaction."""
+    rows = [(k, jdumps(v)) for k, v in values.items()]
+    with conn(write=True) as con:
+        con.execute("BEGIN IMMEDIATE")
+        con.executemany("REPLACE INTO settings(k,v) VALUES (?,?)", rows)
+        con.execute("COMMIT")
+        with _SETTINGS_LOCK: _SETTINGS.update(rows)
 def get_setting(k: str, default=None):
-    with closing(db()) as con:
-        cur = con.execute("SELECT v FROM settings WHERE k=?", (k,))
-        row = cur.fetchone()
-        if not row: return default
-        try: return json.loads(row["v"])
-        except: return default
-
-def list_clients() -> List[dict]:
-    with closing(db()) as con:
-        cur = con.execute("SELECT id,name,host,user,pass,precheck FROM clients ORDER BY id")
-        return [dict(r) for r in cur.fetchall()]
-def get_active_client_id() -> Optional[int]:
-    cid = get_setting("active_client_id")
-    if cid: return int(cid)
+    try:
+        raw = _SETTINGS[k]
+    except KeyError:
+        with conn() as con:
+            row = con.execute("SELECT v FROM settings WHERE k=?", (k,)).fetchone()
+        raw = row[0] if row else None
+        with _SETTINGS_LOCK: _SETTINGS.setdefault(k, raw)
+    if raw is None: return default
+    try: return jloads(raw)
+    except: return default
+
+# Caches process des tables lues en boucle ; chaque écriture incrémente la version
+_CACHE_LOCK = threading.Lock()
+_VER = {"rules": 0, "sent": 0, "clients": 0}
+_CACHE = {"rules": (-1, None), "sent_cid": (-1, None), "clients": (-1, None)}
+
+def _bump(k: str):
+    with _CACHE_LOCK: _VER[k] += 1
+def _cached(k: str, load):
+    ver, val = _CACHE[k]
+    cur = _VER[k]
+    if ver == cur: return val
+    val = load()
+    _CACHE[k] = (cur, val)
+    return val
+
+def _read_clients(con):
+    cur = con.execute("SELECT id,name,host,user,pass,precheck FROM clients ORDER BY id")
+    return tuple(MappingProxyType({"id": i, "name": n, "host": h, "user": u, "pass": pw, "precheck": pc})
+                 for i, n, h, u, pw, pc in cur)
+def _load_clients():
+    with conn() as con: return _read_clients(con)
+def list_clients() -> Tuple[Mapping, ...]:
+    return _cached("clients", _load_clients)
+def list_clients_with_active() -> Tuple[Tuple[Mapping, ...], Optional[int]]:
+    """Clients + id du client actif (réglage, sinon le premier), en une seule passe."""
     cl = list_clients()
-    return cl[0]["id"] if cl else None
+    cid = get_setting("active_client_id")
+    if cid: return cl, int(cid)
+    return cl, (cl[0]["id"] if cl else None)
+def get_active_client_id() -> Optional[int]:
+    return list_clients_with_active()[1]
 
-def get_rules() -> Dict[str, dict]:
-    with closing(db()) as con:
+def _load_rules():
+    with conn() as con:
         cur = con.execute("SELECT host,category,ratio,seed_days FROM rules")
-        return { r["host"]: dict(r) for r in cur.fetchall() }
+        return MappingProxyType({ host: MappingProxyType({"host": host, "category": cat, "ratio": r, "seed_days": d})
+                                  for host, cat, r, d in cur })
+def get_rules() -> Mapping[str, Mapping]:
+    return _cached("rules", _load_rules)
+def upsert_rules_many(rows: List[Tuple[str, str, Optional[str], Optional[str]]]):
+    """(host, category, ratio, seed_days) : toutes les règles dans une seule transaction."""
+    vals = [(host.strip().lower(), category.strip(), float(ratio) if ratio else None,
+             int(seed_days) if seed_days else None) for host, category, ratio, seed_days in rows]
+    if not vals: return
+    with conn(write=True) as con:
+        con.execute("BEGIN IMMEDIATE")
+        con.executemany("REPLACE INTO rules(host,category,ratio,seed_days) VALUES (?,?,?,?)", vals)
+        con.execute("COMMIT")
+        _bump("rules")
 def upsert_rule(host, category, ratio, seed_days):
-    with closing(db()) as con:
-        con.execute("REPLACE INTO rules(host,category,ratio,seed_days) VALUES (?,?,?,?)",
-                    (host.strip().lower(), category.strip(), float(ratio) if ratio else None,
-                     int(seed_days) if seed_days else None))
-        con.commit()
+    upsert_rules_many([(host, category, ratio, seed_days)])
 def del_rule(host):
-    with closing(db()) as con:
+    with conn(write=True) as con:
         con.execute("DELETE FROM rules WHERE host=?", (host,))
-        con.commit()
-
-def record_sent(infohash: str, client_id: int):
-    with closing(db()) as con:
-        con.execute("REPLACE INTO sent(infohash,client_id,ts) VALUES (?,?,?)",
-                    (infohash.lower(), int(client_id), now_ts()))
-        con.commit()
-def sent_map() -> Dict[str, Tuple[int,int]]:
-    with closing(db()) as con:
-        cur = con.execute("SELECT infohash,client_id,ts FROM sent")
-        return { r["infohash"].lower(): (r["client_id"], r["ts"]) for r in cur.fetchall() }
+        _bump("rules")
+
+def record_sent_many(items: List[Tuple[str,int]], ts: Optional[int] = None):
+    if not items: return
+    t = now_ts() if ts is None else int(ts)  # un seul horodatage pour tout le lot
+    rows = [(ih.lower(), int(cid), t) for ih, cid in items]
+    with conn(write=True) as con:
+        con.execute("BEGIN IMMEDIATE")
+        con.executemany("REPLACE INTO sent(infohash,client_id,ts) VALUES (?,?,?)", rows)
+        con.execute("COMMIT")
+        _bump("sent")
+def record_sent(infohash: str, client_id: int, ts: Optional[int] = None):
+    record_sent_many([(infohash, client_id)], ts)
+def _read_sent_cid(con):
+    return MappingProxyType({ ih.lower(): cid for ih, cid in con.execute("SELECT infohash,client_id FROM sent") })
+def sent_cid_map() -> Mapping[str, int]:
+    """infohash -> client_id, invalidé par _bump("sent")."""
+    return scan_prefetch()[1]
+def scan_prefetch() -> Tuple[Tuple[Mapping, ...], Mapping[str, int]]:
+    """(clients, sent_cid) pour un rendu : les caches périmés sont rechargés ensemble sur une seule connexion."""
+    stale = [(k, _VER[v], rd) for k, v, rd in (("clients", "clients", _read_clients), ("sent_cid", "sent", _read_sent_cid))
+             if _CACHE[k][0] != _VER[v]]
+    if stale:
+        with conn() as con:
+            for k, ver, rd in stale: _CACHE[k] = (ver, rd(con))
+    return _CACHE["clients"][1], _CACHE["sent_cid"][1]
+SQL_IN_CHUNK = 500  # sous la limite SQLITE_MAX_VARIABLE_NUMBER historique (999)
+
+def sent_among(hashes: List[str]) -> set:
+    """Infohashes (minuscules) déjà envoyés parmi les candidats : cache s'il est à jour,
+    sinon IN (?,…) par paquets sur la clé primaire, sans charger toute la table."""
+    hs = list({h.lower() for h in hashes})
+    ver, m = _CACHE["sent_cid"]
+    if ver == _VER["sent"]: return {h for h in hs if h in m}
+    out = set()
+    with conn() as con:
+        for i in range(0, len(hs), SQL_IN_CHUNK):
+            part = hs[i:i+SQL_IN_CHUNK]
+            out.update(r[0] for r in con.execute(
+                f"SELECT infohash FROM sent WHERE infohash IN ({','.join('?'*len(part))})", part))
+    return out
 
 def delete_sent_all() -> int:
-    with closing(db()) as con:
-        cur = con.execute("SELECT COUNT(*) AS n FROM sent")
-        n = cur.fetchone()["n"]
-        con.execute("DELETE FROM sent")
-        con.commit()
+    with conn(write=True) as con:
+        n = con.execute("DELETE FROM sent").rowcount
+        _bump("sent")
         return n
 def delete_sent_by_infohashes(hashes: List[str]) -> int:
     if not hashes: return 0
-    placeholders = ",".join("?" for _ in hashes)
-    with closing(db()) as con:
-        cur = con.execute(f"DELETE FROM sent WHERE infohash IN ({placeholders})", [h.lower() for h in hashes])
-        con.commit()
-        return cur.rowcount
+    # Table temporaire plutôt qu'un IN (?,?,…) : pas de limite SQLITE_MAX_VARIABLE_NUMBER
+    with conn(write=True) as con:
+        con.execute("CREATE TEMP TABLE IF NOT EXISTS _del(h TEXT PRIMARY KEY)")
+        con.execute("BEGIN IMMEDIATE")
+        con.execute("DELETE FROM _del")
+        con.executemany("INSERT OR IGNORE INTO _del VALUES (?)", [(h.lower(),) for h in hashes])
+        n = con.execute("DELETE FROM sent WHERE infohash IN (SELECT h FROM _del)").rowcount
+        con.execute("COMMIT")
+        _bump("sent")
+        return n
 
 # -------------------- Auth --------------------
 def logged_in() -> bool: return bool(session.get("auth"))
@@ -796,6 +980,10 @@ T_DASH = """{% extends "base.html" %}
 <div class="card shadow-sm mt-3">
   <div class="card-body">
     <div class="chart-holder"><canvas id="comboChart"></canvas></div>
+    <div class="small-muted mt-1">
+      {% if dash.live_age is none %}État qBit en cours de chargement (rafraîchir la page).
+      {% else %}État qBit relevé il y a {{ dash.live_age }} s.{% endif %}
+    </div>
   </div>
 </div>
 <script>
@@ -891,7 +1079,7 @@ window.addEventListener('theme-changed', ()=>{
           <tr>
             <td class="name-cell">{{ row['name'] }}</td>
             <td class="small">{{ row['label'] }}</td>
-            <td class="text-end nowrap">{{ row['size_hr'] }}</td>
+            <td class="text-end nowrap">{{ row['size_b']|human }}</td>
             <td class="text-end">
               {% if row.get('live_seed') %}
                 <span class="badge bg-success">En seed</span>
@@ -920,7 +1108,7 @@ window.addEventListener('theme-changed', ()=>{
           <tr>
             <td class="name-cell">{{ row['name'] }}</td>
             <td class="small">{{ row['label'] }}</td>
-            <td class="text-end small nowrap">{{ row['date_hr'] }}</td>
+            <td class="text-end small nowrap">{{ row['ts']|dt }}</td>
             <td class="text-end">
               {% if row.get('live_seed') %}
                 <span class="badge bg-success">En seed</span>
@@ -949,7 +1137,7 @@ window.addEventListener('theme-changed', ()=>{
           <tr>
             <td class="name-cell">{{ row['name'] }}</td>
             <td class="small">{{ row['label'] }}</td>
-            <td class="text-end small nowrap">{{ row['date_hr'] }}</td>
+            <td class="text-end small nowrap">{{ row['ts']|dt }}</td>
             <td class="text-end">
               {% if row.get('live_seed') %}
                 <span class="badge bg-success">En seed</span>
@@ -1260,7 +1448,7 @@ T_SCAN = """{% extends "base.html" %}
         <span class="small-muted ms-1">{{ global_total_hr }}</span>
       </a>
       {% for label, grp in grouped.items() %}
-        {% set anchor = 'grp-' ~ (label|slug) %}
+        {% set anchor = 'grp-' ~ grp['slug'] %}
         <a class="btn btn-sm btn-outline-dark" href="#{{ anchor }}">
           {{ label }}
           <span class="badge bg-secondary">{{ grp['items']|length }}</span>
@@ -1317,18 +1505,12 @@ T_SCAN = """{% extends "base.html" %}
               <tbody>
                 {% for it in global_items %}
                 <tr data-size="{{ it['size_b'] or 0 }}" data-ts="{{ it['ts'] or 0 }}">
-                  <td><input type="checkbox" class="grp0" name="sel" value="{{ it['magnet'] }}||{{ it['tracker_host'] }}||{{ it['infohash'] }}||{{ it['json_path'] }}"></td>
+                  <td><input type="checkbox" class="grp0" name="sel" value="{{ it['magnet'] }}||{{ it['tracker_host'] }}||{{ it['infohash'] }}||{{ it['size_b'] or 0 }}"></td>
                   <td class="name-cell">{{ it['name'] }}</td>
-                  <td class="nowrap">{{ it['size_hr'] }}</td>
-                  <td class="small nowrap">{{ it['date_hr'] }}</td>
-                  <td class="small">
-                    {% if it['live_seed'] %}
-                      <a href="{{ it['live_client_url'] }}" target="_blank" rel="noopener" class="text-decoration-none">
-                        <span class="badge bg-success">En seed</span>
-                        <span class="small-muted">({{ it['live_client'] or it['sent_client'] }})</span>
-                        {% if it['qbit_state'] %}<span class="small-muted">[{{ it['qbit_state'] }}]</span>{% endif %}
-                      </a>
-                    {% elif it['sent'] %}
+                  <td class="nowrap">{{ it['size_b']|human }}</td>
+                  <td class="small nowrap">{{ it['ts']|dt }}</td>
+                  <td class="small seeding-cell" data-ih="{{ it['infohash']|lower }}">
+                    {% if it['sent'] %}
                       <span class="badge bg-warning">Seedé</span> <span class="small-muted">({{ it['sent_client'] }})</span>
                     {% else %}
                       <span class="badge bg-danger">Jamais</span>
@@ -1347,7 +1529,7 @@ T_SCAN = """{% extends "base.html" %}
     <!-- Par tracker -->
     {% for label, grp in grouped.items() %}
     {% set gi = loop.index %}
-    {% set anchor = 'grp-' ~ (label|slug) %}
+    {% set anchor = 'grp-' ~ grp['slug'] %}
     <div class="accordion-item" id="{{ anchor }}">
       <h2 class="accordion-header" id="h-{{ gi }}">
         <div class="scan-acc-header">
@@ -1393,18 +1575,12 @@ T_SCAN = """{% extends "base.html" %}
               <tbody>
                 {% for it in grp['items'] %}
                 <tr data-size="{{ it['size_b'] or 0 }}" data-ts="{{ it['ts'] or 0 }}">
-                  <td><input type="checkbox" class="grp{{ gi }}" name="sel" value="{{ it['magnet'] }}||{{ it['tracker_host'] }}||{{ it['infohash'] }}||{{ it['json_path'] }}"></td>
+                  <td><input type="checkbox" class="grp{{ gi }}" name="sel" value="{{ it['magnet'] }}||{{ it['tracker_host'] }}||{{ it['infohash'] }}||{{ it['size_b'] or 0 }}"></td>
                   <td class="name-cell">{{ it['name'] }}</td>
-                  <td class="nowrap">{{ it['size_hr'] }}</td>
-                  <td class="small nowrap">{{ it['date_hr'] }}</td>
-                  <td class="small">
-                    {% if it['live_seed'] %}
-                      <a href="{{ it['live_client_url'] }}" target="_blank" rel="noopener" class="text-decoration-none">
-                        <span class="badge bg-success">En seed</span>
-                        <span class="small-muted">({{ it['live_client'] or it['sent_client'] }})</span>
-                        {% if it['qbit_state'] %}<span class="small-muted">[{{ it['qbit_state'] }}]</span>{% endif %}
-                      </a>
-                    {% elif it['sent'] %}
+                  <td class="nowrap">{{ it['size_b']|human }}</td>
+                  <td class="small nowrap">{{ it['ts']|dt }}</td>
+                  <td class="small seeding-cell" data-ih="{{ it['infohash']|lower }}">
+                    {% if it['sent'] %}
                       <span class="badge bg-warning">Seedé</span> <span class="small-muted">({{ it['sent_client'] }})</span>
                     {% else %}
                       <span class="badge bg-danger">Jamais</span>
@@ -1440,6 +1616,28 @@ document.getElementById('collapseAllBtn')?.addEventListener('click', ()=>{
     const c = bootstrap.Collapse.getOrCreateInstance(el, {toggle:false}); c.hide();
   });
 });
+// Statut qBit chargé après le rendu : remplace le badge des torrents actuellement en seed
+document.addEventListener('DOMContentLoaded', async ()=>{
+  let live;
+  try{
+    const r = await fetch(`{{ url_for('scan_live') }}`, {cache:'no-store'});
+    live = await r.json();
+  }catch(e){ return; }
+  document.querySelectorAll('.seeding-cell[data-ih]').forEach(td=>{
+    const v = live[td.dataset.ih];
+    if(!v) return;
+    const a = document.createElement('a');
+    a.href = v.url; a.target = '_blank'; a.rel = 'noopener'; a.className = 'text-decoration-none';
+    const b = document.createElement('span'); b.className = 'badge bg-success'; b.textContent = 'En seed';
+    const c = document.createElement('span'); c.className = 'small-muted'; c.textContent = ` (${v.client})`;
+    a.append(b, c);
+    if(v.state){
+      const st = document.createElement('span'); st.className = 'small-muted'; st.textContent = ` [${v.state}]`;
+      a.append(st);
+    }
+    td.replaceChildren(a);
+  });
+});
 </script>
 {% endblock %}
 """
@@ -1470,12 +1668,7 @@ pull();
 """
 
 # -------------------- App init --------------------
-app = Flask(__name__)
-import re as _re
-app.jinja_env.filters['slug'] = lambda s: _re.sub(r'[^a-z0-9-]+', '-', (s or '').lower()).strip('-')
-app.secret_key = os.environ.get("MCC_SECRET", os.urandom(24))
-app.wsgi_app = ProxyFix(app.wsgi_app)
-app.jinja_loader = DictLoader({
+TEMPLATES = {
   "base.html": T_BASE,
   "login.html": T_LOGIN,
   "dashboard.html": T_DASH,
@@ -1483,7 +1676,77 @@ app.jinja_loader = DictLoader({
   "settings.html": T_SETTINGS,
   "scan.html": T_SCAN,
   "logs.html": T_LOGS,
-})
+}
+
+def _private_dir(path: str) -> bool:
+    """Crée path en 0700 ; True seulement si c'est un vrai dossier à nous, non accessible en écriture
+    au groupe/aux autres (le bytecode y est rechargé via marshal : un tiers ne doit pas pouvoir l'écrire)."""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode): return False
+    if hasattr(os, "getuid") and st.st_uid != os.getuid(): return False
+    if st.st_mode & 0o077:
+        os.chmod(path, 0o700)  # dossier à nous mais trop ouvert : on le referme
+    return True
+
+def jinja_bytecode_cache() -> Optional[FileSystemBytecodeCache]:
+    """Cache disque du bytecode Jinja (survit aux redémarrages) ; None si le dossier n'est pas inscriptible.
+    Un sous-dossier par version des sources : une modif des T_* repart d'un cache vide."""
+    h = hashlib.sha1()
+    for name in sorted(TEMPLATES): h.update(name.encode()); h.update(TEMPLATES[name].encode())
+    directory = os.path.join(JINJA_CACHE_DIR, h.hexdigest()[:8])
+    try:
+        if _private_dir(JINJA_CACHE_DIR) and _private_dir(directory):
+            return FileSystemBytecodeCache(directory)
+        logger.warning("Jinja bytecode cache désactivé : %s (ou son parent) n'est pas un dossier privé de l'utilisateur", directory)
+    except OSError as e:
+        logger.warning("Jinja bytecode cache désactivé (%s): %s", directory, e)
+    return None
+
+app = Flask(__name__)
+# Templates embarqués : pas de rechargement à chaud, bytecode compilé réutilisé
+app.jinja_options = {**app.jinja_options, "auto_reload": False, "bytecode_cache": jinja_bytecode_cache(),
+                     "cache_size": -1}
+class _SlugTable(dict):
+    """Table str.translate : garde [a-z0-9-], tout autre caractère devient un espace (mémorisé au 1er passage)."""
+    def __missing__(self, c: int):
+        v = self[c] = c if chr(c) in "abcdefghijklmnopqrstuvwxyz0123456789-" else 32
+        return v
+
+_SLUG_TBL = _SlugTable()
+
+@functools.lru_cache(maxsize=1024)
+def _slug(s: str) -> str:
+    # split()/join regroupe les suites de caractères interdits en un seul "-", comme l'ancienne regex
+    return "-".join((s or "").lower().translate(_SLUG_TBL).split()).strip("-")
+
+def fmt_ts(ts) -> str:
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M") if ts else ""
+
+app.jinja_env.filters['slug'] = _slug
+# Tailles/dates formatées au rendu : seules les lignes affichées paient le formatage
+app.jinja_env.filters['human'] = human
+app.jinja_env.filters['dt'] = fmt_ts
+app.secret_key = os.environ.get("MCC_SECRET", os.urandom(24))
+app.wsgi_app = ProxyFix(app.wsgi_app)
+app.jinja_loader = DictLoader(TEMPLATES)
+# Compilation unique à l'import ; les vues rendent ces objets Template directement
+_COMPILED = {n: app.jinja_env.get_template(n) for n in TEMPLATES}
+
+def render(name: str, **ctx) -> str:
+    return render_template(_COMPILED[name], **ctx)
+
+STREAM_BUFFER = 4096  # évènements Jinja regroupés par morceau envoyé
+
+def render_stream(name: str, **ctx) -> Response:
+    """Rendu en flux (réponse chunked) pour les pages volumineuses : l'en-tête part avant la fin des tableaux."""
+    # Flashs consommés maintenant : la session (cookie) est enregistrée avant l'envoi du corps
+    get_flashed_messages(with_categories=True)
+    app.update_template_context(ctx)
+    stream = _COMPILED[name].stream(ctx)
+    stream.enable_buffering(STREAM_BUFFER)
+    return Response(stream_with_context(stream), mimetype="text/html")
+
 app.logger.setLevel(logging.INFO)
 
 # -------------------- qBit helpers --------------------
@@ -1493,54 +1756,112 @@ def qbt_client(row: dict) -> qbittorrentapi.Client:
     c.auth_log_in()
     return c
 
-def qbit_live_seed_map() -> Dict[str, dict]:
+def qbit_free_space(c: qbittorrentapi.Client) -> int:
+    """free_space_on_disk du serveur qBit (exception si l'API ne répond pas)."""
+    md = c.sync.maindata()
+    server_state = getattr(md,'server_state',None) or (md.get('server_state') if isinstance(md,dict) else None)
+    return int(getattr(server_state,'free_space_on_disk',None) or (server_state.get('free_space_on_disk') if server_state else 0))
+
+def share_limits(rule: Mapping) -> Tuple[float, int]:
+    """(ratio_limit, seeding_time_limit en minutes) d'une règle, valeurs par défaut 2.0 / 14 j."""
+    return float(rule.get('ratio') or 2.0), int(rule.get('seed_days') or 14)*24*60
+
+def qbit_add_batch(c: qbittorrentapi.Client, batch: List[Tuple[str, str]], category: str, limits: Tuple[float, int]):
+    """Lot (magnet, infohash) de même catégorie/limites : 1 ajout multi-URL (tag inclus) + 1 appel de limites."""
+    c.torrents_add(
+        urls=[m for m, _ in batch],
+        category=category,
+        use_auto_torrent_management=True,
+        tags="DecypharrSeed"
+    )
+    try:
+        c.torrents_set_share_limits(
+            ratio_limit=limits[0],
+            seeding_time_limit=limits[1],
+            inactive_seeding_time_limit=-1,
+            hashes="|".join(ih.upper() for _, ih in batch)
+        )
+    except Exception: pass
+
+def _live_seed_one(row: Mapping) -> Dict[str, dict]:
+    """Torrents d'un client qBit ; {} si le client est injoignable (n'affecte pas les autres)."""
+    out: Dict[str, dict] = {}
+    try:
+        c = qbt_client(row)
+        for t in c.torrents_info():
+            ih = (getattr(t, "hash", "") or "").lower()
+            st = str(getattr(t, "state", "") or "")
+            live = st.endswith("UP") or st in {"uploading","stalledUP","queuedUP","pausedUP","checkingUP","forcedUP"}
+            out[ih] = {
+                "live": bool(live),
+                "client": row.get("name") or f"client#{row.get('id')}",
+                "state": st,
+                "ratio": float(getattr(t, "ratio", 0) or 0),
+                "category": (getattr(t, "category", "") or "").strip(),
+                "url": row.get("host") or "",
+            }
+    except Exception as e:
+        app.logger.warning("qBit live map KO pour %s: %s", row.get("name"), e)
+    return out
+
+def _fetch_live_seed_map(clients: Tuple[Mapping, ...]) -> Dict[str, dict]:
+    out: Dict[str, dict] = {}
+    if not clients: return out
+    with ThreadPoolExecutor(max_workers=min(8, len(clients))) as ex:
+        for part in ex.map(_live_seed_one, clients):
+            out.update(part)
+    return out
+
+LIVE_TTL = 5  # secondes
+# t : horodatage de validité (remis à 0 pour invalider) ; at : instant réel du dernier relevé ; bg : relevé de fond en cours
+_LIVE_CACHE = {"t": 0.0, "at": 0.0, "v": None, "bg": False, "lock": threading.Lock()}
+
+def qbit_live_seed_map(clients: Optional[Tuple[Mapping, ...]] = None) -> Dict[str, dict]:
     """
     Map infohash(lower) -> {live: bool, client: str, state: str, ratio: float, category: str, url: str}
     live=True si présent et en état de seed/upload côté qBit.
+    Les clients sont interrogés en parallèle ; en cas de doublon, le dernier client (par id) l'emporte.
+    Résultat mémorisé LIVE_TTL secondes (un seul rafraîchissement à la fois).
+    clients : liste déjà chargée par l'appelant (sinon list_clients()).
     """
-    out: Dict[str, dict] = {}
-    for row in list_clients():
-        try:
-            c = qbt_client(row)
-            for t in c.torrents_info():
-                ih = (getattr(t, "hash", "") or "").lower()
-                st = str(getattr(t, "state", "") or "")
-                live = st.endswith("UP") or st in {"uploading","stalledUP","queuedUP","pausedUP","checkingUP","forcedUP"}
-                out[ih] = {
-                    "live": bool(live),
-                    "client": row.get("name") or f"client#{row.get('id')}",
-                    "state": st,
-                    "ratio": float(getattr(t, "ratio", 0) or 0),
-                    "category": (getattr(t, "category", "") or "").strip(),
-                    "url": row.get("host") or "",
-                }
-        except Exception as e:
-            app.logger.warning("qBit live map KO pour %s: %s", row.get("name"), e)
-    return out
-
-def qbit_live_counts_by_label(items: List[dict]) -> Dict[str, int]:
+    if _LIVE_CACHE["v"] is not None and time.monotonic() - _LIVE_CACHE["t"] < LIVE_TTL:
+        return _LIVE_CACHE["v"]
+    with _LIVE_CACHE["lock"]:
+        if _LIVE_CACHE["v"] is not None and time.monotonic() - _LIVE_CACHE["t"] < LIVE_TTL:
+            return _LIVE_CACHE["v"]
+        v = _fetch_live_seed_map(list_clients() if clients is None else clients)
+        _LIVE_CACHE["v"], _LIVE_CACHE["t"] = v, time.monotonic()
+        _LIVE_CACHE["at"] = _LIVE_CACHE["t"]
+        return v
+
+def _refresh_live_bg():
+    try: qbit_live_seed_map()
+    except Exception as e: logger.warning("qBit live map (fond) KO: %s", e)
+    finally: _LIVE_CACHE["bg"] = False
+
+def qbit_live_seed_map_nowait() -> Tuple[Dict[str, dict], Optional[int]]:
     """
-    Compte les torrents ACTUELLEMENT EN SEED, uniquement parmi les JSON DecypharrSeed.
-    Vérifie leur état dans les clients qBittorrent (live=True) sans jamais inclure d'autres torrents.
+    Dernière map connue sans attendre qBit, + son âge en secondes (None si aucun relevé encore).
+    Si elle est périmée, un relevé est lancé en tâche de fond pour les rendus suivants.
     """
-    live_map = qbit_live_seed_map()
-    out: Dict[str, int] = {}
-
-    for it in items:
-        ih = (it.get("infohash") or "").lower()
-        lbl = it.get("tracker_host") or "(inconnu)"
-
-        if not ih:
-            continue
-
-        if ih in live_map and live_map[ih].get("live"):
-            out[lbl] = out.get(lbl, 0) + 1
-
-    return out
+    v = _LIVE_CACHE["v"]
+    if (v is None or time.monotonic() - _LIVE_CACHE["t"] >= LIVE_TTL) and not _LIVE_CACHE["bg"]:
+        _LIVE_CACHE["bg"] = True
+        threading.Thread(target=_refresh_live_bg, daemon=True).start()
+    if v is None: return {}, None
+    return v, int(time.monotonic() - _LIVE_CACHE["at"])
 
+def invalidate_live_map():
+    _LIVE_CACHE["t"] = 0.0
 
 # -------------------- Scan JSON --------------------
 MAGNET_RE = re.compile(r"magnet:[^\s\"'<>]+", re.IGNORECASE)
+_BTIH_HEX = re.compile(r"xt=urn:btih:([a-fA-F0-9]{40})")
+_BTIH_B32 = re.compile(r"xt=urn:btih:([a-zA-Z0-9]{32})")
+_TR_RE = re.compile(r"&tr=([^&]+)")
+# Hôte d'un tracker http(s) : ignore user:pass@, port et chemin ; IPv6 entre crochets.
+# Schéma en minuscules uniquement, comme le startswith("http://") d'avant
+_HOST_RE = re.compile(r"https?://(?:[^/@?#]*@)?(?:\[([^\]/]+)\]|([^/:?#\[\]]+))")
 
 def get_json_dirs() -> List[str]:
     v = get_setting("json_dirs")
@@ -1548,143 +1869,135 @@ def get_json_dirs() -> List[str]:
     return DEFAULT_JSON_DIRS
 
 def parse_trackers_from_magnet(magnet: str) -> List[str]:
-    try:
-        from urllib.parse import urlsplit, parse_qs, unquote
-        qs = parse_qs(urlsplit(magnet).query)
-        trs = []
-        for t in qs.get("tr", []):
-            t = unquote(t)
-            if t.startswith("http://") or t.startswith("https://"):
-                host = urlsplit(t).hostname or ""
-                if host: trs.append(host.lower())
-        return trs
-    except Exception:
-        return []
+    if "tr=" not in magnet: return []  # magnets DHT seuls : pas de regex
+    # même portée que urlsplit(magnet).query : après le premier « ? », avant le fragment « # »
+    query = magnet.split("#", 1)[0].partition("?")[2]
+    trs = []
+    for v in _TR_RE.findall("&" + query):
+        # parse_qs décodait déjà une fois, puis unquote : on garde le double décodage
+        m = _HOST_RE.match(unquote(unquote_plus(v)))
+        if m: trs.append((m.group(1) or m.group(2)).lower())
+    return trs
 
 def extract_infohash(data: dict, magnet: str) -> Optional[str]:
     ih = (data.get("info_hash") or data.get("infoHash") or "").lower()
     if ih: return ih
-    m = re.search(r"xt=urn:btih:([a-fA-F0-9]{40})", magnet)
+    m = _BTIH_HEX.search(magnet)
     if m: return m.group(1).lower()
-    m = re.search(r"xt=urn:btih:([a-zA-Z0-9]{32})", magnet)  # base32
+    m = _BTIH_B32.search(magnet)  # base32
     if m: return m.group(1).lower()
     return None
 
+def _pos_int(v) -> int:
+    """Entier > 0 au sens de int() comme avant, sinon 0 (invalide, infini, chaîne trop longue…)."""
+    if type(v) is int: return v if v > 0 else 0  # cas courant, sans try
+    try: n = int(v)
+    except (TypeError, ValueError, OverflowError): return 0
+    return n if n > 0 else 0
+
 def extract_size_bytes(data: dict) -> int:
-    try:
-        b = int(data.get("bytes") or 0)
-        if b > 0: return b
-    except: pass
-    try:
-        files = data.get("files") or {}
-        if isinstance(files, dict):
-            s = 0
-            for v in files.values():
-                sz = int(v.get("size") or 0)
-                if sz > 0: s += sz
-            if s>0: return s
-    except: pass
-    try:
-        b = int(data.get("size") or 0)
-        if b > 0: return b
-    except: pass
-    return 0
+    b = _pos_int(data.get("bytes"))
+    if b: return b
+    files = data.get("files")
+    if isinstance(files, dict):
+        s = 0
+        for v in files.values():
+            if isinstance(v, dict): s += _pos_int(v.get("size"))
+        if s: return s
+    return _pos_int(data.get("size"))
 
 def label_for_hosts(hosts: List[str], rules: Dict[str,dict]) -> Tuple[str,str]:
+    # Chaînes internées : quelques dizaines de libellés/hôtes partagés par tous les items
     primary = hosts[0] if hosts else NO_TRACKER_LABEL
     for h in hosts:
         r = rules.get(h)
         if r and r.get("category"):
-            return r.get("category"), h
+            return sys.intern(r.get("category")), sys.intern(h)
+    primary = sys.intern(primary)
     return primary, primary
 
-def scan_jsons():
-    dirs = get_json_dirs()
-    files = []
+SCAN_WORKERS = 16
+
+def _list_jsons(dirs: List[str]) -> List[Tuple[str, os.stat_result]]:
+    """(chemin, stat) des *.json des dossiers : un seul stat() par fichier via os.scandir."""
+    out = []
     for d in dirs:
-        p = Path(d)
-        if not p.exists(): continue
-        files.extend(p.glob("*.json"))
+        try:
+            with os.scandir(d) as it:
+                for e in it:
+                    if not e.name.endswith(".json") or not e.is_file(): continue
+                    try: out.append((e.path, e.stat()))
+                    except OSError: pass
+        except OSError:
+            continue
+    return out
 
-    rules = get_rules()
+def _load_one(entry: Tuple[str, os.stat_result]) -> Optional[Tuple[str, os.stat_result, bytes, dict]]:
+    path, st = entry
+    try:
+        with open(path, "rb") as f: raw = f.read()
+    except OSError:
+        return None
+    try:
+        data = jloads(raw)  # orjson : octets parsés directement, sans décodage préalable
+    except Exception:
+        # UTF-8 invalide, NaN, grands entiers… : repli tolérant comme avant
+        try: data = json.loads(raw.decode("utf-8", errors="ignore"))
+        except Exception: return None
+    return (path, st, raw, data) if isinstance(data, dict) else None
+
+def _scan_files(files: List[Tuple[str, os.stat_result]], rules: Mapping[str, Mapping]):
+    """Partie dérivée des seuls fichiers (+ règles) : items, regroupement par libellé, résumé."""
     last_hosts_set = set()
 
-    grouped: Dict[str,dict] = {}
+    grouped: Dict[str,dict] = defaultdict(lambda: {"items": [], "total": 0, "hosts": set(), "rule_summary": ""})
     global_items = []
     total_b = 0
+    # méthodes liées une fois, hors de la boucle par fichier
+    add_item, add_hosts = global_items.append, last_hosts_set.update
 
-    for jp in files:
-        try:
-            raw = jp.read_text(encoding="utf-8", errors="ignore")
-            data = json.loads(raw)
-        except Exception:
-            continue
+    # Lectures disque en parallèle (I/O), puis extraction séquentielle (CPU)
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as ex:
+        loaded = [r for r in ex.map(_load_one, files) if r]
 
+    for jp, st, raw, data in loaded:
         magnet = data.get("link") or (data.get("magnet") or {}).get("link") or ""
         if not magnet or not magnet.startswith("magnet:"):
-            m = MAGNET_RE.search(raw)
+            m = MAGNET_RE.search(raw.decode("utf-8", errors="ignore"))
             magnet = m.group(0) if m else ""
         if not magnet: continue
 
         hosts = parse_trackers_from_magnet(magnet)
         if not hosts:
             hosts = [NO_TRACKER_LABEL]
-        for h in hosts: last_hosts_set.add(h)
+        add_hosts(hosts)
 
         label, rule_host = label_for_hosts(hosts, rules)
 
         name = data.get("name") or data.get("filename") or data.get("original_filename") \
                or (data.get("magnet") or {}).get("name") or "Sans nom"
-        infohash = extract_infohash(data, magnet) or f"nohash_{jp.name}"
+        # toujours en minuscules (extract_infohash l'est déjà) : aucun .lower() côté consommateurs
+        infohash = extract_infohash(data, magnet) or f"nohash_{os.path.basename(jp).lower()}"
         size_b = extract_size_bytes(data)
-        ts = int(Path(jp).stat().st_mtime)
-        date_hr = datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M")
+        ts = int(st.st_mtime)
 
         item = {
-            "name": name, "size_b": size_b, "size_hr": human(size_b),
-            "ts": ts, "date_hr": date_hr,
-            "magnet": magnet, "infohash": infohash, "json_path": str(jp),
+            "name": name, "size_b": size_b, "ts": ts,
+            "magnet": magnet, "infohash": infohash, "json_path": jp,
             "tracker_host": rule_host, "tracker_label": label,
         }
-        global_items.append(item)
+        add_item(item)
         total_b += size_b
+        g = grouped[label]
+        g["items"].append(item); g["total"] += size_b; g["hosts"].add(rule_host)
 
     set_setting("last_scan_hosts", sorted(last_hosts_set))
-
-    s_map = sent_map()
-    live_map = qbit_live_seed_map()
-
-    for it in global_items:
-        ih = it["infohash"].lower()
-        if ih in s_map:
-            cid, _t = s_map[ih]
-            cname = next((c["name"] for c in list_clients() if c["id"]==cid), f"client#{cid}")
-            it["sent"] = True; it["sent_client"] = cname
-        else:
-            it["sent"] = False; it["sent_client"] = ""
-
-        if ih in live_map:
-            it["live_seed"]  = bool(live_map[ih]["live"])
-            it["qbit_state"] = live_map[ih]["state"]
-            it["live_client"] = live_map[ih]["client"]
-            it["live_client_url"] = live_map[ih].get("url") or ""
-        else:
-            it["live_seed"]  = False
-            it["qbit_state"] = ""
-            it["live_client"] = ""
-            it["live_client_url"] = ""
-
-    grouped = {}
-    for it in global_items:
-        lbl = it["tracker_label"]
-        g = grouped.setdefault(lbl, {"items": [], "total": 0, "hosts": set(), "rule_summary": ""})
-        g["items"].append(it)
-        g["total"] += it["size_b"] or 0
-        g["hosts"].add(it["tracker_host"])
+    grouped = dict(grouped)  # plus de création implicite de groupe côté appelants/templates
 
     for lbl, g in grouped.items():
         g["total_hr"] = human(g["total"])
-        r_list = [ get_rules().get(h) for h in g["hosts"] ]
+        g["slug"] = _slug(lbl)  # ancre calculée une fois par scan, pas à chaque rendu
+        r_list = [ rules.get(h) for h in g["hosts"] ]
         r_list = [r for r in r_list if r]
         if r_list:
             r0 = r_list[0]
@@ -1697,121 +2010,235 @@ def scan_jsons():
     summary = { "files": len(files), "items": len(global_items), "trackers": len(grouped), "total_b": total_b }
     return grouped, global_items, summary
 
+def _overlay_status(grouped: Dict[str, dict], global_items: List[dict]):
+    """Statut « envoyé » (base locale) recalculé à chaque appel, y compris sur un scan en cache.
+    Copies superficielles par appel : le scan en cache partagé entre threads n'est jamais modifié."""
+    clients, s_cid = scan_prefetch()
+    cnames = {c["id"]: sys.intern(c["name"] or "") for c in clients}
+
+    items = []
+    for it in global_items:
+        cid = s_cid.get(it["infohash"])
+        if cid is not None:
+            items.append({**it, "sent": True, "sent_client": cnames.get(cid, f"client#{cid}")})
+        else:
+            items.append({**it, "sent": False, "sent_client": ""})
+    # mêmes groupes, mêmes ordres : chaque item appartient au groupe de son libellé
+    out = {lbl: {**g, "items": []} for lbl, g in grouped.items()}
+    for it in items: out[it["tracker_label"]]["items"].append(it)
+    return out, items
+
+def overlay_live(global_items: List[dict], live_map: Mapping[str, dict]):
+    """Statut qBit (en seed) depuis un relevé déjà fait ; renvoie des copies superficielles des items."""
+    out = []
+    for it in global_items:
+        lv = live_map.get(it["infohash"])
+        if lv:
+            out.append({**it, "live_seed": bool(lv["live"]), "qbit_state": lv["state"],
+                        "live_client": lv["client"], "live_client_url": lv.get("url") or ""})
+        else:
+            out.append({**it, "live_seed": False, "qbit_state": "", "live_client": "", "live_client_url": ""})
+    return out
+
+_SCAN_CACHE = {"sig": None, "val": None, "lock": threading.Lock()}
+
+def _scan_sig(rules_ver: int, files: List[Tuple[str, os.stat_result]]) -> bytes:
+    """Empreinte blake2s : version des règles (libellés/récaps en dépendent) + (chemin, mtime, taille) des JSON."""
+    h = hashlib.blake2s(str(rules_ver).encode())
+    for jp, st in sorted(files, key=lambda f: f[0]):
+        h.update(os.fsencode(jp))  # octets bruts : noms non UTF-8 acceptés
+        h.update(f"\0{st.st_mtime_ns}\0{st.st_size}\n".encode())
+    return h.digest()
+
+def scan_jsons():
+    return scan_jsons_sig()[1:]
+
+def scan_jsons_sig():
+    """(sig, grouped, items, summary) : sig est l'empreinte du résultat réellement renvoyé."""
+    rules_ver = _VER["rules"]
+    files = _list_jsons(get_json_dirs())
+    sig = _scan_sig(rules_ver, files)
+
+    # Verrou : un scan auto du worker et une requête simultanés ne parsent pas deux fois
+    with _SCAN_CACHE["lock"]:
+        if sig == _SCAN_CACHE["sig"]:
+            grouped, global_items, summary = _SCAN_CACHE["val"]
+        else:
+            grouped, global_items, summary = _scan_files(files, get_rules())
+            _SCAN_CACHE["sig"], _SCAN_CACHE["val"] = sig, (grouped, global_items, summary)
+    # Statut « envoyé » posé sur des copies superficielles (pas de deepcopy de tout le scan)
+    grouped, global_items = _overlay_status(grouped, global_items)
+    return sig, grouped, global_items, summary
+
 # -------------------- Backup/Worker/Autosend --------------------
 def purge_old_backups(outdir: Path, retention_days: int = 7):
     try:
         cutoff = time.time() - retention_days*86400
-        for f in outdir.glob("magnetcc-*.sqlite"):
-            try:
-                if f.stat().st_mtime < cutoff: f.unlink()
-            except Exception as e:
-                logger.warning("BACKUP purge fail %s: %s", f, e)
+        with os.scandir(outdir) as it:
+            for f in it:
+                if not (f.name.startswith("magnetcc-") and f.name.endswith(".sqlite")): continue
+                try:
+                    if f.stat().st_mtime < cutoff: os.unlink(f.path)
+                except Exception as e:
+                    logger.warning("BACKUP purge fail %s: %s", f.path, e)
     except Exception as e:
         logger.warning("BACKUP purge error: %s", e)
 
-def do_backup():
-    cfg = get_setting("backup_cfg", {"enabled": False, "dir": "/data/backup", "retention_days": 7})
+BACKUP_PAGES = 1000  # pages copiées par étape de sqlite3.Connection.backup
+
+def do_backup(cfg: Optional[dict] = None):
+    if cfg is None: cfg = get_setting("backup_cfg", {"enabled": False, "dir": "/data/backup", "retention_days": 7})
     if not cfg.get("enabled"): return
     try:
         outdir = Path(cfg.get("dir") or "/data/backup"); outdir.mkdir(parents=True, exist_ok=True)
         ts = datetime.now().strftime("%Y%m%d-%H%M%S")
         dest = outdir / f"magnetcc-{ts}.sqlite"
-        data = Path(DB_PATH).read_bytes()
-        dest.write_bytes(data)
-        set_setting("backup_last", datetime.now().strftime("%Y-%m-%d %H:%M"))
-        set_setting("backup_last_ts", now_ts())
+        # API backup SQLite : copie page par page d'un instantané cohérent (WAL compris),
+        # sans charger la base en mémoire ni bloquer les écritures
+        dst = sqlite3.connect(str(dest))
+        try:
+            with conn() as src: src.backup(dst, pages=BACKUP_PAGES, sleep=0.01)
+        except Exception:
+            dst.close(); dest.unlink(missing_ok=True)
+            raise
+        dst.close()
+        set_settings({"backup_last": datetime.now().strftime("%Y-%m-%d %H:%M"), "backup_last_ts": now_ts()})
         logger.info("BACKUP ✅ %s", dest)
         purge_old_backups(outdir, int(cfg.get("retention_days", 7)))
     except Exception as e:
         logger.error("BACKUP ❌ %s", e)
 
-WORKER_THREAD = {"t": None, "stop": False}
+WORKER_THREAD = {"t": None, "stop": False, "wake": False, "cv": threading.Condition()}
+WORKER_MIN_WAIT = 60    # secondes : plancher = ancienne cadence (une tâche en échec, ex. backup, ne relance pas plus souvent)
+WORKER_MAX_WAIT = 3600  # filet de sécurité quand rien n'est planifié
+
+def _worker_next_wait(now: int) -> float:
+    """Secondes jusqu'à la prochaine échéance (backup quotidien / scan auto), bornées."""
+    due = [WORKER_MAX_WAIT]
+    bk = get_setting("backup_cfg", {"enabled": False, "dir": "/data/backup", "retention_days": 7})
+    if bk.get("enabled"):
+        due.append(ensure_int(get_setting("backup_last_ts", 0), 0) + 86400 - now)
+    cfg = get_setting("autoscan_cfg", {"enabled": False, "interval": 10})
+    if cfg.get("enabled"):
+        interval_sec = max(1, ensure_int(cfg.get("interval"), 10)) * 60
+        due.append(ensure_int(get_setting("autoscan_last_ts", 0), 0) + interval_sec - now)
+    return max(WORKER_MIN_WAIT, min(due))
+
+def wake_worker():
+    """Réveille le worker (réglages modifiés) : les nouvelles échéances s'appliquent tout de suite."""
+    cv = WORKER_THREAD["cv"]
+    with cv:
+        WORKER_THREAD["wake"] = True; cv.notify_all()
+
+def stop_worker():
+    cv = WORKER_THREAD["cv"]
+    with cv:
+        WORKER_THREAD["stop"] = True; cv.notify_all()
+atexit.register(stop_worker)
+
 def worker_loop():
     logger.info("WORKER ▶ start")
+    cv = WORKER_THREAD["cv"]
     while not WORKER_THREAD["stop"]:
+        WORKER_THREAD["wake"] = False
         try:
             now = now_ts()
             bk = get_setting("backup_cfg", {"enabled": False, "dir": "/data/backup", "retention_days": 7})
             if bk.get("enabled"):
                 last_bk = ensure_int(get_setting("backup_last_ts", 0), 0)
-                if now - last_bk >= 86400: do_backup()
+                if now - last_bk >= 86400: do_backup(bk)
             cfg = get_setting("autoscan_cfg", {"enabled": False, "interval": 10})
             if cfg.get("enabled"):
                 last_scan = ensure_int(get_setting("autoscan_last_ts", 0), 0)
                 interval_sec = max(1, ensure_int(cfg.get("interval"), 10)) * 60
                 if now - last_scan >= interval_sec:
                     grouped, items, summary = scan_jsons()
-                    set_setting("autoscan_last", datetime.now().strftime("%Y-%m-%d %H:%M"))
-                    set_setting("autoscan_last_ts", now)
+                    set_settings({"autoscan_last": datetime.now().strftime("%Y-%m-%d %H:%M"), "autoscan_last_ts": now})
                     logger.info("SCAN(auto) ✅ items=%d trackers=%d", len(items), len(grouped))
                     added = autosend_process(items)
                     if added: logger.info("AUTOSEND(auto) ✅ added=%d", added)
+                    qbit_live_seed_map()  # relevé qBit à jour pour le tableau de bord
+            wait = _worker_next_wait(now_ts())
         except Exception as e:
             logger.error("WORKER loop error: %s", e)
-        for _ in range(6):
-            if WORKER_THREAD["stop"]: break
-            time.sleep(10)
+            wait = 60
+        with cv:
+            cv.wait_for(lambda: WORKER_THREAD["stop"] or WORKER_THREAD["wake"], timeout=wait)
     logger.info("WORKER ■ stop")
 
 def autosend_process(items: List[dict]):
     autosend = get_setting("autosend_cfg", {"global_enabled": False, "global_client": None, "map": {}})
     rules = get_rules()
-    sent = sent_map()
+    sent = sent_cid_map()  # déjà chargée par scan_jsons() juste avant dans le worker
     if not items: return 0
     added_total = 0
     global_client = autosend.get("global_client") if autosend.get("global_enabled") else None
     map_by_label = autosend.get("map") or {}
     clients = {c["id"]: c for c in list_clients()}
+    to_record: List[Tuple[str,int]] = []
+    batches: Dict[Tuple[int, str, Tuple[float, int]], List[dict]] = {}
+    qbt_cache: Dict[int, Optional[qbittorrentapi.Client]] = {}
+    free_cache: Dict[int, Optional[int]] = {}
+    # Règles résolues une fois par host : (catégorie, (ratio, seed en minutes))
+    resolved = {h: (r.get("category"), share_limits(r)) for h, r in rules.items()}
+    no_rule = (None, share_limits({}))
     def client_for(it):
         lbl = it["tracker_label"]
         cid = map_by_label.get(lbl) or global_client
         return clients.get(int(cid)) if cid else None
     for it in items:
-        ih = it["infohash"].lower()
+        ih = it["infohash"]
         if ih in sent: continue
         row_client = client_for(it)
         if not row_client: continue
-        try:
-            c = qbt_client(row_client)
-        except Exception as e:
-            logger.warning("Autosend: client KO %s: %s", row_client.get("name"), e)
-            continue
+        cid = row_client["id"]
+        if cid not in qbt_cache:  # une connexion (login) par client et par passe, échec compris
+            try:
+                qbt_cache[cid] = qbt_client(row_client)
+            except Exception as e:
+                logger.warning("Autosend: client KO %s: %s", row_client.get("name"), e)
+                qbt_cache[cid] = None
+        c = qbt_cache[cid]
+        if c is None: continue
         do_precheck = bool(int(row_client.get("precheck",1)))
         if do_precheck:
-            try:
-                md = c.sync.maindata()
-                server_state = getattr(md,'server_state',None) or (md.get('server_state') if isinstance(md,dict) else None)
-                free_b = int(getattr(server_state,'free_space_on_disk',None) or (server_state.get('free_space_on_disk') if server_state else 0))
+            if cid not in free_cache:  # espace libre lu une fois, puis décompté localement
+                try: free_cache[cid] = qbit_free_space(c)
+                except Exception: free_cache[cid] = None
+            free_b = free_cache[cid]
+            if free_b is not None:
                 if (it["size_b"] or 0) > free_b:
                     logger.info("Autosend skip (space) %s need %s > free %s", ih, human(it["size_b"] or 0), human(free_b))
                     continue
-            except Exception: pass
-        rule = rules.get(it["tracker_host"], {})
-        category = (rule.get("category") or it["tracker_label"] or it["tracker_host"].split('.')[0]).strip()
-        try:
-            # TAG automatique DecypharrSeed
-            c.torrents_add(
-                urls=it["magnet"],
-                category=category,
-                use_auto_torrent_management=True,
-                tags="DecypharrSeed"
-            )
-            try:
-                c.torrents_add_tags(tags="DecypharrSeed", hashes=it["infohash"].upper())
-            except Exception:
-                pass
+                free_cache[cid] = free_b - (it["size_b"] or 0)
+        cat_rule, limits = resolved.get(it["tracker_host"], no_rule)
+        category = (cat_rule or it["tracker_label"] or it["tracker_host"].split('.')[0]).strip()
+        batches.setdefault((row_client["id"], category, limits), []).append(it)
+
+    # Un lot par (client, catégorie, limites) : 2 appels HTTP par lot au lieu de 3 par item.
+    # Clients traités en parallèle ; les lots d'un même client restent séquentiels (une session HTTP chacun).
+    by_client: Dict[int, List[Tuple[str, Tuple[float, int], List[dict]]]] = {}
+    for (cid, category, limits), batch in batches.items():
+        by_client.setdefault(cid, []).append((category, limits, batch))
+
+    def send_client(cid: int) -> List[dict]:
+        row_client, ok = clients[cid], []
+        for category, limits, batch in by_client[cid]:
             try:
-                c.torrents_set_share_limits(
-                    ratio_limit=float(rule.get('ratio') or 2.0),
-                    seeding_time_limit=int(rule.get('seed_days') or 14)*24*60,
-                    inactive_seeding_time_limit=-1,
-                    hashes=it["infohash"].upper()
-                )
-            except Exception: pass
-            record_sent(ih, row_client['id']); added_total += 1
-            logger.info("Autosend ✅ %s -> %s", it["name"], row_client["name"])
-        except Exception as e:
-            logger.warning("Autosend ❌ %s: %s", it["name"], e)
+                qbit_add_batch(qbt_cache[cid], [(it["magnet"], it["infohash"]) for it in batch], category, limits)
+            except Exception as e:
+                for it in batch: logger.warning("Autosend ❌ %s: %s", it["name"], e)
+                continue
+            for it in batch: logger.info("Autosend ✅ %s -> %s", it["name"], row_client["name"])
+            ok.extend(batch)
+        return ok
+
+    if by_client:
+        with ThreadPoolExecutor(max_workers=min(4, len(by_client))) as ex:
+            for cid, ok in zip(by_client, ex.map(send_client, by_client)):
+                to_record.extend((it["infohash"], cid) for it in ok); added_total += len(ok)
+    record_sent_many(to_record)
+    if added_total: invalidate_live_map()
     return added_total
 
 # -------------------- Routes --------------------
@@ -1821,67 +2248,53 @@ def login():
         if request.form.get("user")==LOGIN_USER and request.form.get("pass")==LOGIN_PASS:
             session["auth"]=True; return redirect(url_for('dashboard'))
         flash("Identifiants invalides", "error")
-    return render_template("login.html")
+    return render("login.html")
 
 @app.route('/logout')
 def logout():
     session.clear(); return redirect(url_for('login'))
 
-@app.route('/')
-@login_required
-def dashboard():
-    grouped, items, summary = scan_jsons()
-
-    # --- Agrégation par tracker d’origine (host) pour le graphe ---
-    agg_scan: Dict[str, Dict[str, float]] = {}
-    for it in items:
-        th = it["tracker_host"] or "(inconnu)"
-        d = agg_scan.setdefault(th, {"count": 0, "total": 0})
-        d["count"] += 1
-        d["total"] += it.get("size_b") or 0
-
-    # Seeds ACTIFS par tracker d’origine (via infohash)
-    counts_live_map = qbit_live_counts_by_label(items)  # {tracker_host: n_live}
+def _dashboard_data(grouped: Dict[str, dict], items: List[dict], live_map: Mapping[str, dict],
+                    clients: Tuple[Mapping, ...], active_id: Optional[int]) -> dict:
+    items = overlay_live(items, live_map)
 
-    # Seeds GLOBAL (actif + historique) parmi les éléments du dernier scan
-    counts_seed_global_map: Dict[str, int] = {}
+    # --- Une seule passe : agrégats par tracker d’origine (host) pour le graphe ---
+    # live = seeds ACTIFS côté qBit ; seed = global (actif + historique) parmi les éléments du scan
+    agg: Dict[str, Dict[str, int]] = defaultdict(lambda: {"count": 0, "total": 0, "live": 0, "seed": 0})
+    by_label: Dict[str, List[dict]] = defaultdict(list)  # items avec statut qBit, par libellé (top 3)
+    total_b = 0
     for it in items:
-        th = it["tracker_host"] or "(inconnu)"
-        if it.get("live_seed") or it.get("sent"):
-            counts_seed_global_map[th] = counts_seed_global_map.get(th, 0) + 1
-
-    # Labels et métriques
-    labels = list(agg_scan.keys())
-    # étend avec éventuels trackers présents côté live/global mais pas dans agg_scan
-    for lbl in set(list(counts_live_map.keys()) + list(counts_seed_global_map.keys())):
-        if lbl not in labels:
-            labels.append(lbl)
-            agg_scan.setdefault(lbl, {"count": 0, "total": 0})
-
-    counts_scan = [ int(agg_scan[l]["count"]) for l in labels ]
-    sizes_gb    = [ round((agg_scan[l]["total"] or 0)/(1024**3), 2) for l in labels ]
-    counts_qbit = [ counts_live_map.get(lbl, 0) for lbl in labels ]
-    counts_seed_global = [ counts_seed_global_map.get(lbl, 0) for lbl in labels ]
-
-    # --- blocs de tableaux (inchangés dans leur logique) ---
-    top_heavy = sorted(items, key=lambda x: x["size_b"] or 0, reverse=True)[:10]
-    top_heavy = [{"name":t["name"], "label":t["tracker_label"], "size_hr":t["size_hr"],
-                  "sent":t["sent"], "live_seed":t.get("live_seed", False)} for t in top_heavy]
-    top_latest = sorted(items, key=lambda x: x["ts"] or 0, reverse=True)[:10]
-    top_latest = [{"name":t["name"], "label":t["tracker_label"], "date_hr":t["date_hr"],
-                   "sent":t["sent"], "live_seed":t.get("live_seed", False)} for t in top_latest]
+        by_label[it["tracker_label"]].append(it)
+        d = agg[it["tracker_host"] or "(inconnu)"]
+        sz = it["size_b"] or 0
+        d["count"] += 1; d["total"] += sz; total_b += sz
+        if it["live_seed"]: d["live"] += 1; d["seed"] += 1
+        elif it["sent"]: d["seed"] += 1
+
+    labels = list(agg.keys())
+    counts_scan = [ agg[l]["count"] for l in labels ]
+    sizes_gb    = [ round(agg[l]["total"]/(1024**3), 2) for l in labels ]
+    counts_qbit = [ agg[l]["live"] for l in labels ]
+    counts_seed_global = [ agg[l]["seed"] for l in labels ]
+
+    # --- blocs de tableaux : top 10 sans trier tous les items ---
+    top_heavy = heapq.nlargest(10, items, key=lambda x: x["size_b"] or 0)
+    top_heavy = [{"name":t["name"], "label":t["tracker_label"], "size_b":t["size_b"],
+                  "sent":t["sent"], "live_seed":t["live_seed"]} for t in top_heavy]
+    top_latest = heapq.nlargest(10, items, key=lambda x: x["ts"] or 0)
+    top_latest = [{"name":t["name"], "label":t["tracker_label"], "ts":t["ts"],
+                   "sent":t["sent"], "live_seed":t["live_seed"]} for t in top_latest]
     top3_by_tracker=[]
-    for lbl,g in grouped.items():
-        sub = sorted(g["items"], key=lambda x: x["ts"] or 0, reverse=True)[:3]
+    for lbl in grouped:
+        sub = heapq.nlargest(3, by_label[lbl], key=lambda x: x["ts"] or 0)
         for t in sub:
-            top3_by_tracker.append({"label":lbl, "name":t["name"], "date_hr":t["date_hr"],
-                                    "sent":t["sent"], "live_seed":t.get("live_seed", False)})
-    dash = {
-        "stats": {"trackers": len(grouped), "items": sum(len(g["items"]) for g in grouped.values()),
-                  "total_hr": human(sum((g["total"] or 0) for g in grouped.values()))},
+            top3_by_tracker.append({"label":lbl, "name":t["name"], "ts":t["ts"],
+                                    "sent":t["sent"], "live_seed":t["live_seed"]})
+    return {
+        "stats": {"trackers": len(grouped), "items": len(items), "total_hr": human(total_b)},
         "rules_count": len(get_rules()),
-        "clients_count": len(list_clients()),
-        "active_client": next((c["name"] for c in list_clients() if c["id"]==get_active_client_id()), None),
+        "clients_count": len(clients),
+        "active_client": next((c["name"] for c in clients if c["id"]==active_id), None),
         "chart": {
             "labels":labels,
             "counts_scan":counts_scan,
@@ -1893,7 +2306,28 @@ def dashboard():
         "top_latest": top_latest,
         "top3_by_tracker": top3_by_tracker
     }
-    return render_template("dashboard.html", dash=dash, json_dirs=get_json_dirs(), db_path=DB_PATH)
+
+# Agrégats du tableau de bord mémorisés : (clé, dash) tant que scan/règles/envois/clients/relevé qBit sont inchangés
+_DASH_CACHE = {"v": (None, None)}
+
+@app.route('/')
+@login_required
+def dashboard():
+    # Versions lues AVANT les données et sig renvoyée avec elles : un rescan ou une écriture
+    # concurrente coûte au pire un recalcul de trop, jamais des données anciennes sous une clé récente
+    vers = (_VER["rules"], _VER["sent"], _VER["clients"])
+    live_at = _LIVE_CACHE["at"]
+    scan_sig, grouped, items, summary = scan_jsons_sig()
+    # Pas d'attente réseau : état qBit du dernier relevé (worker / tâche de fond)
+    live_map, live_age = qbit_live_seed_map_nowait()
+    clients, active_id = list_clients_with_active()
+    key = (scan_sig, vers, active_id, live_at)
+    ck, data = _DASH_CACHE["v"]
+    if ck != key:
+        data = _dashboard_data(grouped, items, live_map, clients, active_id)
+        _DASH_CACHE["v"] = (key, data)
+    dash = {**data, "live_age": live_age}
+    return render("dashboard.html", dash=dash, json_dirs=get_json_dirs(), db_path=DB_PATH)
 
 @app.route('/rules', methods=['GET','POST'])
 @login_required
@@ -1911,6 +2345,7 @@ def rules():
             if h: del_rule(h)
             return redirect(url_for('rules'))
         elif action == "save":
+            rows = []
             for k in request.form:
                 if not k.startswith("host_"): continue
                 idx = k.split("_",1)[1]
@@ -1918,40 +2353,40 @@ def rules():
                 cat = request.form.get(f"cat_{idx}") or ""
                 ratio = request.form.get(f"ratio_{idx}") or None
                 seed  = request.form.get(f"seed_{idx}") or None
-                if h: upsert_rule(h, cat, ratio, seed)
+                if h: rows.append((h, cat, ratio, seed))
+            upsert_rules_many(rows)
             flash("Règles enregistrées", "success")
             return redirect(url_for('rules'))
         elif action == "add_from_scan":
             last_hosts = get_setting("last_scan_hosts", [])
-            added=0
-            for h in last_hosts:
-                if h not in get_rules():
-                    upsert_rule(h, "", None, None); added+=1
+            existing = get_rules()
+            new = list(dict.fromkeys(h for h in last_hosts if h not in existing))
+            upsert_rules_many([(h, "", None, None) for h in new])
+            added = len(new)
             flash(f"{added} host(s) ajoutés depuis le dernier scan.", "success")
             return redirect(url_for('rules'))
     # auto-populate depuis le dernier scan (GET)
     try:
         last_hosts = get_setting("last_scan_hosts", []) or []
         if last_hosts:
-            existing = set(get_rules().keys())
-            added_auto = 0
-            for h in last_hosts:
-                if h and h != NO_TRACKER_LABEL and h not in existing:
-                    upsert_rule(h, "", None, None)
-                    added_auto += 1
+            existing = get_rules()
+            new = list(dict.fromkeys(h for h in last_hosts if h and h != NO_TRACKER_LABEL and h not in existing))
+            upsert_rules_many([(h, "", None, None) for h in new])
+            added_auto = len(new)
             if added_auto:
                 logger.info("RULES auto-populate: %d host(s) ajoutés depuis le dernier scan", added_auto)
     except Exception as e:
         logger.warning("RULES auto-populate erreur: %s", e)
     rules_list = list(get_rules().values())
     last_hosts = get_setting("last_scan_hosts", [])
-    return render_template("rules.html", rules=rules_list, last_hosts=last_hosts)
+    return render("rules.html", rules=rules_list, last_hosts=last_hosts)
 
 @app.route('/settings', methods=['GET','POST'])
 @login_required
 def settings():
-    autoscan_cfg = {"enabled": bool(get_setting("autoscan_cfg", {}).get("enabled", False)),
-                    "interval": int(get_setting("autoscan_cfg", {}).get("interval", 10)),
+    as_raw = get_setting("autoscan_cfg", {})
+    autoscan_cfg = {"enabled": bool(as_raw.get("enabled", False)),
+                    "interval": int(as_raw.get("interval", 10)),
                     "last": get_setting("autoscan_last", None)}
     autosend_cfg = get_setting("autosend_cfg", {"global_enabled": False, "global_client": None, "map": {}})
     backup_cfg = get_setting("backup_cfg", {"enabled": False, "dir": "/data/backup", "retention_days": 7})
@@ -1967,40 +2402,39 @@ def settings():
             user = request.form.get("user") or ""
             pw   = request.form.get("pass") or ""
             pre  = 1 if request.form.get("precheck") else 0
-            with closing(db()) as con:
+            with conn(write=True) as con:
                 con.execute("INSERT INTO clients(name,host,user,pass,precheck) VALUES (?,?,?,?,?)",(name, host, user, pw, pre))
-                con.commit()
+                _bump("clients")
+            invalidate_live_map()
             flash("Client qBittorrent ajouté", "success")
         elif action == "del_qbit":
             cid = ensure_int(request.form.get("id"))
-            with closing(db()) as con:
+            with conn(write=True) as con:
                 con.execute("DELETE FROM clients WHERE id=?", (cid,))
-                con.commit()
+                _bump("clients")
+            invalidate_live_map()
             flash("Client supprimé", "success")
         elif action == "toggle_precheck":
             cid = ensure_int(request.form.get("id"))
-            with closing(db()) as con:
-                cur = con.execute("SELECT precheck FROM clients WHERE id=?", (cid,))
-                row = cur.fetchone()
-                if row:
-                    newv = 0 if row["precheck"] else 1
-                    con.execute("UPDATE clients SET precheck=? WHERE id=?", (newv, cid))
-                    con.commit()
+            with conn(write=True) as con:
+                con.execute("UPDATE clients SET precheck = CASE WHEN precheck THEN 0 ELSE 1 END WHERE id=?", (cid,))
+                _bump("clients")
             return redirect(url_for('settings'))
         elif action == "save_autoscan":
             enabled = bool(request.form.get("autoscan_enabled"))
             interval = ensure_int(request.form.get("autoscan_interval"), 10)
             set_setting("autoscan_cfg", {"enabled": enabled, "interval": interval})
+            wake_worker()
             flash("Scan régulier enregistré", "success")
         elif action == "save_autosend_global":
             enabled = bool(request.form.get("as_global_enabled"))
             client  = ensure_int(request.form.get("as_global_client"), 0) or None
-            cfg = get_setting("autosend_cfg", {"global_enabled": False, "global_client": None, "map": {}})
+            cfg = autosend_cfg  # déjà lu en tête (copie décodée, modifiable)
             cfg["global_enabled"]=enabled; cfg["global_client"]=client
             set_setting("autosend_cfg", cfg)
             flash("Auto-envoi global enregistré", "success")
         elif action == "save_autosend_trackers":
-            cfg = get_setting("autosend_cfg", {"global_enabled": False, "global_client": None, "map": {}})
+            cfg = autosend_cfg
             newmap={}
             for k,v in request.form.items():
                 if not k.startswith("map__"): continue
@@ -2013,24 +2447,25 @@ def settings():
             enabled = bool(request.form.get("bk_enabled"))
             bk_dir  = request.form.get("bk_dir") or "/data/backup"
             set_setting("backup_cfg", {"enabled": enabled, "dir": bk_dir, "retention_days": 7})
+            wake_worker()
             flash("Backup BDD: paramètres enregistrés", "success")
         elif action == "backup_now":
-            do_backup(); flash("Backup déclenché", "success")
+            do_backup(backup_cfg); flash("Backup déclenché", "success")
         return redirect(url_for('settings'))
 
     grouped, items, summary = scan_jsons()
     tracker_labels = sorted(grouped.keys())
-    return render_template("settings.html",
-                           json_dirs=get_json_dirs(),
-                           clients=list_clients(),
-                           autoscan=autoscan_cfg,
-                           autosend={"global_enabled": autosend_cfg.get("global_enabled",False),
-                                     "global_client": autosend_cfg.get("global_client"),
-                                     "map": autosend_cfg.get("map",{})},
-                           backup={"enabled": backup_cfg.get("enabled",False),
-                                   "dir": backup_cfg.get("dir","/data/backup"),
-                                   "last": get_setting("backup_last", None)},
-                           tracker_labels=tracker_labels)
+    return render("settings.html",
+                  json_dirs=get_json_dirs(),
+                  clients=list_clients(),
+                  autoscan=autoscan_cfg,
+                  autosend={"global_enabled": autosend_cfg.get("global_enabled",False),
+                            "global_client": autosend_cfg.get("global_client"),
+                            "map": autosend_cfg.get("map",{})},
+                  backup={"enabled": backup_cfg.get("enabled",False),
+                          "dir": backup_cfg.get("dir","/data/backup"),
+                          "last": get_setting("backup_last", None)},
+                  tracker_labels=tracker_labels)
 
 @app.route('/scan')
 @login_required
@@ -2040,12 +2475,21 @@ def scan():
         flash(f"Scan terminé : {summary['items']} items sur {summary['trackers']} trackers.", "success")
     total_b = sum((it["size_b"] or 0) for it in global_items)
     grouped = dict(sorted(grouped.items(), key=lambda kv: kv[0]))
-    return render_template("scan.html",
-                           grouped=grouped,
-                           global_items=global_items,
-                           global_total_hr=human(total_b),
-                           active_id=get_active_client_id(),
-                           clients=list_clients())
+    clients, active_id = list_clients_with_active()
+    return render_stream("scan.html",
+                         grouped=grouped,
+                         global_items=global_items,
+                         global_total_hr=human(total_b),
+                         active_id=active_id,
+                         clients=clients)
+
+@app.route('/scan/live.json')
+@login_required
+def scan_live():
+    """États qBit des torrents en seed, chargés après affichage de /scan (le rendu n'attend pas qBit)."""
+    live = {ih: {"state": v["state"], "client": v["client"], "url": v.get("url") or ""}
+            for ih, v in qbit_live_seed_map().items() if v.get("live")}
+    return app.response_class(jdumpb(live), mimetype="application/json")
 
 @app.route('/enqueue', methods=['POST'])
 @login_required
@@ -2066,25 +2510,19 @@ def enqueue():
     free_b = None
     if do_precheck:
         try:
-            md = c.sync.maindata()
-            server_state = getattr(md,'server_state',None) or (md.get('server_state') if isinstance(md,dict) else None)
-            free_b = int(getattr(server_state,'free_space_on_disk',None) or (server_state.get('free_space_on_disk') if server_state else 0))
+            free_b = qbit_free_space(c)
         except Exception as e:
             app.logger.warning("precheck: free_space_on_disk KO (%s)", e)
 
-    already = sent_map()
     total_needed = 0; unknown = 0; parsed=[]
     for packed in sel:
+        # magnet||host||infohash||taille : la taille vient du scan, pas de relecture des JSON
         try:
-            magnet, host, ih, jp = packed.split("||",3)
+            magnet, host, ih, size_f = packed.split("||",3)
         except ValueError:
             continue
-        parsed.append((magnet, host, ih, jp))
-        try:
-            data = json.loads(Path(jp).read_text(encoding="utf-8", errors="ignore"))
-        except:
-            data = {}
-        sz = extract_size_bytes(data)
+        parsed.append((magnet, host, ih))
+        sz = ensure_int(size_f, 0)
         if sz>0: total_needed += sz
         else: unknown += 1
 
@@ -2101,36 +2539,28 @@ def enqueue():
 
     rules = get_rules()
     added = 0
-    for magnet, tracker_host, ih, _jp in parsed:
+    to_record: List[Tuple[str,int]] = []
+    batches: Dict[Tuple[str, Tuple[float, int]], List[Tuple[str, str]]] = {}
+    already = sent_among([ih for _, _, ih in parsed])  # une requête pour toute la sélection
+    for magnet, tracker_host, ih in parsed:
         if ih.lower() in already:
             app.logger.info("skip (déjà envoyée): %s", ih)
             continue
         rule = rules.get(tracker_host, {})
         category = (rule.get("category") or tracker_host.split(".")[0]).strip()
+        batches.setdefault((category, share_limits(rule)), []).append((magnet, ih))
+    # Un lot par (catégorie, limites) : 2 appels HTTP par lot
+    for (category, limits), batch in batches.items():
         try:
-            c.torrents_add(
-                urls=magnet,
-                category=category,
-                use_auto_torrent_management=True,
-                tags="DecypharrSeed"
-            )
-            try:
-                c.torrents_add_tags(tags="DecypharrSeed", hashes=ih.upper())
-            except Exception:
-                pass
-            try:
-                c.torrents_set_share_limits(
-                    ratio_limit=float(rule.get('ratio') or 2.0),
-                    seeding_time_limit=int(rule.get('seed_days') or 14)*24*60,
-                    inactive_seeding_time_limit=-1,
-                    hashes=ih.upper()
-                )
-            except Exception: pass
-            record_sent(ih, client_row['id'])
-            added += 1
+            qbit_add_batch(c, batch, category, limits)
         except Exception as e:
-            flash(f"Ajout échoué pour {ih[:8]}…: {e}", 'error')
+            flash(f"Ajout échoué pour {len(batch)} release(s) ({category}): {e}", 'error')
+            continue
+        to_record.extend((ih, client_row['id']) for _, ih in batch)
+        added += len(batch)
+    record_sent_many(to_record)
 
+    if added: invalidate_live_map()
     flash(f"Ajouts envoyés: {added}", 'success' if added else 'warning')
     return redirect(url_for('scan'))
 
@@ -2138,6 +2568,7 @@ def enqueue():
 @login_required
 def reset_sent():
     scope = request.form.get("scope")
+    invalidate_live_map()
     if scope == "global":
         n = delete_sent_all()
         flash(f"État réinitialisé pour {n} release(s) (global).", "success")
@@ -2156,14 +2587,13 @@ def reset_sent():
 @app.route('/logs')
 @login_required
 def logs():
-    return render_template("logs.html")
+    return render("logs.html")
 @app.route('/logs/tail')
 @login_required
 def logs_tail():
     since = ensure_int(request.args.get("since"), 0)
-    lines = [f"{r['msg']}" for r in list(LOG_RING) if r["seq"]>since]
-    cur = LOG_SEQ["n"]
-    return jsonify({"lines": lines, "cursor": cur})
+    lines, cur = log_tail(since)
+    return app.response_class(jdumpb({"lines": lines, "cursor": cur}), mimetype="application/json")
 
 # -------------------- Run --------------------
 def start_worker_once():